@@ -0,0 +1,83 @@
+"""
+Numba-compiled kernels for generating view sphere camera poses
+"""
+import numba
+import numpy as np
+
+@numba.njit(cache=True, fastmath=True)
+def build_rotations(radii, elevs, azs, rolls):
+    """Compute the camera to object rotations and camera centers for every
+    combination of the given spherical coordinates.
+
+    Poses are ordered by radius, then elevation, then azimuth, then roll.
+
+    Parameters
+    ----------
+    radii : :obj:`numpy.ndarray` of float
+        Radii of the view sphere.
+    elevs : :obj:`numpy.ndarray` of float
+        Elevations (angle from z-axis) of the camera.
+    azs : :obj:`numpy.ndarray` of float
+        Azimuths (angle from x-axis) of the camera.
+    rolls : :obj:`numpy.ndarray` of float
+        Rolls of the camera about its optical axis.
+
+    Returns
+    -------
+    :obj:`numpy.ndarray` of float
+        An Nx3x3 array of rotations from camera to object frame.
+    :obj:`numpy.ndarray` of float
+        An Nx3 array of camera centers in the object frame.
+    """
+    num_poses = radii.shape[0] * elevs.shape[0] * azs.shape[0] * rolls.shape[0]
+    out_R = np.empty((num_poses, 3, 3))
+    out_t = np.empty((num_poses, 3))
+
+    # rolls are shared by every view, so compute their sines and cosines once
+    cos_rolls = np.cos(rolls)
+    sin_rolls = np.sin(rolls)
+
+    i = 0
+    for radius in radii:
+        for elev in elevs:
+            for az in azs:
+                # camera center from spherical coords
+                cx = radius * np.cos(az) * np.sin(elev)
+                cy = radius * np.sin(az) * np.sin(elev)
+                cz = radius * np.cos(elev)
+                inv_norm = 1.0 / np.sqrt(cx*cx + cy*cy + cz*cz)
+                zx = -cx * inv_norm
+                zy = -cy * inv_norm
+                zz = -cz * inv_norm
+
+                # canonical camera x and y axes, with the sign of x chosen
+                # so that y always points down
+                h = np.sqrt(zx*zx + zy*zy)
+                if h == 0.0:
+                    xx = 1.0
+                    xy = 0.0
+                else:
+                    xx = zy / h
+                    xy = -zx / h
+                yx = -zz*xy
+                yy = zz*xx
+                yz = zx*xy - zy*xx
+
+                # rotate by each roll
+                for j in range(rolls.shape[0]):
+                    c = cos_rolls[j]
+                    s = sin_rolls[j]
+                    out_R[i,0,0] = c*xx + s*yx
+                    out_R[i,1,0] = c*xy + s*yy
+                    out_R[i,2,0] = s*yz
+                    out_R[i,0,1] = c*yx - s*xx
+                    out_R[i,1,1] = c*yy - s*xy
+                    out_R[i,2,1] = c*yz
+                    out_R[i,0,2] = zx
+                    out_R[i,1,2] = zy
+                    out_R[i,2,2] = zz
+                    out_t[i,0] = cx
+                    out_t[i,1] = cy
+                    out_t[i,2] = cz
+                    i += 1
+    return out_R, out_t
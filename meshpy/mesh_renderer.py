@@ -5,21 +5,167 @@ Author: Jeff Mahler
 import copy
 import IPython
 import logging
+import multiprocessing
 import numpy as np
 import os
 import sys
 import time
+import weakref
 
 try:
     import meshrender
 except:
     pass
 
+try:
+    from meshpy._pose_numba import build_rotations
+except ImportError:
+    build_rotations = None
+
 from autolab_core import Point, RigidTransform
-from autolab_core.utils import sph2cart, cart2sph
 from perception import CameraIntrinsics, BinaryImage, ColorImage, DepthImage, RgbdImage, ObjectRender
 from meshpy import MaterialProperties, LightingProperties, RenderMode
 
+# mesh and render settings shared by every chunk in a worker process, set once
+# per worker by the pool initializer so only the poses are sent with each chunk
+_worker_render_args = None
+
+def _init_render_worker(render_args):
+    """Store the render settings of a pool worker.
+
+    Parameters
+    ----------
+    render_args : :obj:`tuple`
+        The image height, image width, vertex array, triangle array, normal
+        array, material property array, whether or not to enable lighting,
+        and the debug flag.
+    """
+    global _worker_render_args
+    _worker_render_args = render_args
+
+def _render_pose_chunk(chunk):
+    """Render a chunk of poses in a pool worker. Module-level so that it can
+    be dispatched to worker processes.
+
+    Parameters
+    ----------
+    chunk : :obj:`tuple`
+        The projection matrices and light property arrays of the chunk.
+
+    Returns
+    -------
+    :obj:`tuple` of :obj:`numpy.ndarray`
+        The rendered color and depth images of the chunk.
+    """
+    projections, light_props_arrs = chunk
+    return _render_poses((projections, light_props_arrs) + _worker_render_args)
+
+def _render_poses(args):
+    """Render a mesh from a chunk of projection matrices.
+
+    Parameters
+    ----------
+    args : :obj:`tuple`
+        The projection matrices, light property arrays, image height, image
+        width, vertex array, triangle array, normal array, material property
+        array, whether or not to enable lighting, and the debug flag.
+
+    Returns
+    -------
+    :obj:`tuple` of :obj:`numpy.ndarray`
+        The rendered color images as an (N, height, width, 3) uint8 array and
+        depth images as an (N, height, width) float32 array.
+    """
+    projections, light_props_arrs, im_height, im_width, vertex_arr, tri_arr, \
+        norms_arr, mat_props_arr, enable_lighting, debug = args
+    num_poses = len(projections)
+    color_ims = np.empty([num_poses, im_height, im_width, 3], dtype=np.uint8)
+    depth_ims = np.empty([num_poses, im_height, im_width], dtype=np.float32)
+    for i, (P, light_props_arr) in enumerate(zip(projections, light_props_arrs)):
+        # the lighting differs per pose, so render one pose at a time directly
+        # into its slice of the output buffers
+        meshrender.render_mesh_into([P],
+                                    im_height,
+                                    im_width,
+                                    vertex_arr,
+                                    tri_arr,
+                                    norms_arr,
+                                    mat_props_arr,
+                                    light_props_arr,
+                                    color_ims[i:i+1],
+                                    depth_ims[i:i+1],
+                                    enable_lighting,
+                                    debug)
+    return color_ims, depth_ims
+
+def _cross3(a, b):
+    """Cross product of two 3-vectors, written out to avoid the broadcasting
+    overhead of np.cross.
+
+    Parameters
+    ----------
+    a : :obj:`numpy.ndarray` of float
+        The first 3-vector.
+    b : :obj:`numpy.ndarray` of float
+        The second 3-vector.
+
+    Returns
+    -------
+    :obj:`numpy.ndarray` of float
+        The cross product a x b.
+    """
+    return np.array([a[1]*b[2] - a[2]*b[1],
+                     a[2]*b[0] - a[0]*b[2],
+                     a[0]*b[1] - a[1]*b[0]])
+
+def _roll_rotations(rolls):
+    """Rotations about the camera z-axis for each of a set of rolls.
+
+    Parameters
+    ----------
+    rolls : :obj:`numpy.ndarray` of float
+        The camera rolls.
+
+    Returns
+    -------
+    :obj:`numpy.ndarray` of float
+        An Nx3x3 array of rotation matrices, one per roll.
+    """
+    R = np.zeros([rolls.shape[0], 3, 3])
+    R[:,0,0] = np.cos(rolls)
+    R[:,0,1] = -np.sin(rolls)
+    R[:,1,0] = np.sin(rolls)
+    R[:,1,1] = np.cos(rolls)
+    R[:,2,2] = 1
+    return R
+
+def _discretize(min_val, max_val, num, endpoint=True):
+    """Evenly spaced values over an interval, collapsing degenerate
+    intervals to a single value. Half-open intervals with no width and
+    reversed intervals contain no values, matching the original loops.
+
+    Parameters
+    ----------
+    min_val : float
+        Start of the interval.
+    max_val : float
+        End of the interval.
+    num : int
+        Number of values to generate.
+    endpoint : bool
+        Whether or not to include max_val.
+
+    Returns
+    -------
+    :obj:`numpy.ndarray` of float
+        The discretized values.
+    """
+    if max_val < min_val or (not endpoint and max_val == min_val):
+        return np.array([])
+    if endpoint and (num == 1 or min_val == max_val):
+        return np.array([min_val])
+    return np.linspace(min_val, max_val, num, endpoint=endpoint)
+
 class ViewsphereDiscretizer(object):
     """Set of parameters for automatically rendering a set of images from virtual
     cameras placed around a viewing sphere.
@@ -104,6 +250,54 @@ class ViewsphereDiscretizer(object):
         self.max_roll = max_roll
         self.num_roll = num_roll
 
+    @staticmethod
+    def sph2cart(r, az, elev):
+        """Convert spherical coordinates on the view sphere to cartesian
+        coordinates. Accepts scalars or arrays.
+
+        Parameters
+        ----------
+        r : float or :obj:`numpy.ndarray` of float
+            Radius.
+        az : float or :obj:`numpy.ndarray` of float
+            Azimuth (angle from x-axis).
+        elev : float or :obj:`numpy.ndarray` of float
+            Elevation (angle from z-axis).
+
+        Returns
+        -------
+        :obj:`numpy.ndarray` of float
+            The points, with the x, y, z coordinates along the last axis.
+        """
+        sin_elev = np.sin(elev)
+        return np.stack([r * np.cos(az) * sin_elev,
+                         r * np.sin(az) * sin_elev,
+                         r * np.cos(elev)], axis=-1)
+
+    @staticmethod
+    def cart2sph(x, y, z):
+        """Convert cartesian coordinates to the spherical coordinates used
+        by the view sphere. Accepts scalars or arrays.
+
+        Parameters
+        ----------
+        x : float or :obj:`numpy.ndarray` of float
+            X coordinate.
+        y : float or :obj:`numpy.ndarray` of float
+            Y coordinate.
+        z : float or :obj:`numpy.ndarray` of float
+            Z coordinate.
+
+        Returns
+        -------
+        :obj:`tuple` of float or :obj:`numpy.ndarray` of float
+            The radius, azimuth in [0, 2*pi), and elevation (angle from the z-axis).
+        """
+        r = np.sqrt(x**2 + y**2 + z**2)
+        az = np.arctan2(y, x) % (2 * np.pi)
+        elev = np.arccos(z / r)
+        return r, az, elev
+
     def object_to_camera_poses(self):
         """Turn the params into a set of object to camera transformations.
 
@@ -113,65 +307,50 @@ class ViewsphereDiscretizer(object):
             A list of rigid transformations that transform from object space
             to camera space.
         """
-        # compute increments in radial coordinates
-        if self.max_radius == self.min_radius:
-            radius_inc = 1
-        elif self.num_radii == 1:
-            radius_inc = self.max_radius - self.min_radius + 1
-        else:
-            radius_inc = (self.max_radius - self.min_radius) / (self.num_radii - 1)
-        az_inc = (self.max_az - self.min_az) / self.num_az
-        if self.max_elev == self.min_elev:
-            elev_inc = 1
-        elif self.num_elev == 1:
-            elev_inc = self.max_elev - self.min_elev + 1
+        # discretize each spherical coordinate
+        radii = _discretize(self.min_radius, self.max_radius, self.num_radii)
+        elevs = _discretize(self.min_elev, self.max_elev, self.num_elev)
+        azs = _discretize(self.min_az, self.max_az, self.num_az, endpoint=False) #not inclusive due to topology (simplifies things)
+        rolls = _discretize(self.min_roll, self.max_roll, self.num_roll, endpoint=False)
+
+        if build_rotations is not None:
+            # use the compiled kernel when numba is available
+            R_obj_camera, t_obj_camera = build_rotations(radii, elevs, azs, rolls)
         else:
-            elev_inc = (self.max_elev - self.min_elev) / (self.num_elev - 1)
-        roll_inc = (self.max_roll - self.min_roll) / self.num_roll
-
-        # create a pose for each set of spherical coords
+            # create a set of spherical coords for each view, shared by all rolls
+            radius, elev, az = [g.ravel() for g in np.meshgrid(radii, elevs, azs, indexing='ij')]
+            num_views = radius.shape[0]
+
+            # generate camera centers from spherical coords
+            camera_center_obj = ViewsphereDiscretizer.sph2cart(radius, az, elev)
+            camera_z_obj = -camera_center_obj / np.linalg.norm(camera_center_obj, axis=1)[:,np.newaxis]
+
+            # find the canonical camera x and y axes, choosing the sign of x so
+            # that y always points down (y_z = -sqrt(z_x^2 + z_y^2) <= 0)
+            h = np.sqrt(camera_z_obj[:,0]**2 + camera_z_obj[:,1]**2)
+            degenerate = h == 0
+            h = np.where(degenerate, 1.0, h)
+            camera_x_par_obj = np.c_[np.where(degenerate, 1.0, camera_z_obj[:,1] / h),
+                                     -camera_z_obj[:,0] / h,
+                                     np.zeros(num_views)]
+            z, x = camera_z_obj, camera_x_par_obj
+            camera_y_par_obj = np.stack([z[:,1]*x[:,2] - z[:,2]*x[:,1],
+                                         z[:,2]*x[:,0] - z[:,0]*x[:,2],
+                                         z[:,0]*x[:,1] - z[:,1]*x[:,0]], axis=1)
+
+            # rotate each view by every roll
+            R_obj_camera_par = np.stack([camera_x_par_obj, camera_y_par_obj, camera_z_obj], axis=2)
+            R_camera_par_camera = _roll_rotations(rolls)
+            R_obj_camera = np.einsum('nij,mjk->nmik', R_obj_camera_par, R_camera_par_camera).reshape(-1, 3, 3)
+            t_obj_camera = np.repeat(camera_center_obj, rolls.shape[0], axis=0)
+
+        # create final transforms, inverting the camera poses directly
+        R_camera_obj = np.transpose(R_obj_camera, (0, 2, 1))
+        t_camera_obj = -np.einsum('nij,nj->ni', R_camera_obj, t_obj_camera)
         object_to_camera_poses = []
-        radius = self.min_radius
-        while radius <= self.max_radius:
-            elev = self.min_elev
-            while elev <= self.max_elev:
-                az = self.min_az
-                while az < self.max_az: #not inclusive due to topology (simplifies things)
-                    roll = self.min_roll
-                    while roll < self.max_roll:
-
-                        # generate camera center from spherical coords
-                        camera_center_obj = np.array([sph2cart(radius, az, elev)]).squeeze()
-                        camera_z_obj = -camera_center_obj / np.linalg.norm(camera_center_obj)
-
-                        # find the canonical camera x and y axes
-                        camera_x_par_obj = np.array([camera_z_obj[1], -camera_z_obj[0], 0])
-                        if np.linalg.norm(camera_x_par_obj) == 0:
-                            camera_x_par_obj = np.array([1, 0, 0])
-                        camera_x_par_obj = camera_x_par_obj / np.linalg.norm(camera_x_par_obj)
-                        camera_y_par_obj = np.cross(camera_z_obj, camera_x_par_obj)
-                        camera_y_par_obj = camera_y_par_obj / np.linalg.norm(camera_y_par_obj)
-                        if camera_y_par_obj[2] > 0:
-                            camera_x_par_obj = -camera_x_par_obj
-                            camera_y_par_obj = np.cross(camera_z_obj, camera_x_par_obj)
-                            camera_y_par_obj = camera_y_par_obj / np.linalg.norm(camera_y_par_obj)
-
-                        # rotate by the roll
-                        R_obj_camera_par = np.c_[camera_x_par_obj, camera_y_par_obj, camera_z_obj]
-                        R_camera_par_camera = np.array([[np.cos(roll), -np.sin(roll), 0],
-                                                        [np.sin(roll), np.cos(roll), 0],
-                                                        [0, 0, 1]])
-                        R_obj_camera = R_obj_camera_par.dot(R_camera_par_camera)
-                        t_obj_camera = camera_center_obj
-
-                        # create final transform
-                        T_obj_camera = RigidTransform(R_obj_camera, t_obj_camera,
-                                                      from_frame='camera', to_frame='obj')
-                        object_to_camera_poses.append(T_obj_camera.inverse())
-                        roll += roll_inc
-                    az += az_inc
-                elev += elev_inc
-            radius += radius_inc
+        for R, t in zip(R_camera_obj, t_camera_obj):
+            object_to_camera_poses.append(RigidTransform(R, t,
+                                                         from_frame='obj', to_frame='camera'))
         return object_to_camera_poses
 
 class PlanarWorksurfaceDiscretizer(object):
@@ -265,111 +444,65 @@ class PlanarWorksurfaceDiscretizer(object):
             A list of camera intrinsics that project the translated object
             into the center pixel of the camera, simulating cropping
         """
-        # compute increments in radial coordinates
-        if self.max_radius == self.min_radius:
-            radius_inc = 1
-        elif self.num_radii == 1:
-            radius_inc = self.max_radius - self.min_radius + 1
-        else:
-            radius_inc = (self.max_radius - self.min_radius) / (self.num_radii - 1)
-        az_inc = (self.max_az - self.min_az) / self.num_az
-        if self.max_elev == self.min_elev:
-            elev_inc = 1
-        elif self.num_elev == 1:
-            elev_inc = self.max_elev - self.min_elev + 1
-        else:
-            elev_inc = (self.max_elev - self.min_elev) / (self.num_elev - 1)
-        roll_inc = (self.max_roll - self.min_roll) / self.num_roll
-
-        if self.max_x == self.min_x:
-            x_inc = 1
-        elif self.num_x == 1:
-            x_inc = self.max_x - self.min_x + 1
-        else:
-            x_inc = (self.max_x - self.min_x) / (self.num_x - 1)
-
-
-        if self.max_y == self.min_y:
-            y_inc = 1
-        elif self.num_y == 1:
-            y_inc = self.max_y - self.min_y + 1
-        else:
-            y_inc = (self.max_y - self.min_y) / (self.num_y - 1)
+        # discretize each spherical coordinate and planar translation
+        radii = _discretize(self.min_radius, self.max_radius, self.num_radii)
+        elevs = _discretize(self.min_elev, self.max_elev, self.num_elev)
+        azs = _discretize(self.min_az, self.max_az, self.num_az, endpoint=False) #not inclusive due to topology (simplifies things)
+        rolls = _discretize(self.min_roll, self.max_roll, self.num_roll, endpoint=False)
+        xs = _discretize(self.min_x, self.max_x, self.num_x)
+        ys = _discretize(self.min_y, self.max_y, self.num_y)
+        R_camera_par_cameras = _roll_rotations(rolls)
+        grid = np.meshgrid(radii, elevs, azs, np.arange(rolls.shape[0]), xs, ys, indexing='ij')
 
         # create a pose for each set of spherical coords
         object_to_camera_poses = []
         object_to_camera_normalized_poses = []
         camera_shifted_intrinsics = []
-        radius = self.min_radius
-        while radius <= self.max_radius:
-            elev = self.min_elev
-            while elev <= self.max_elev:
-                az = self.min_az
-                while az < self.max_az: #not inclusive due to topology (simplifies things)
-                    roll = self.min_roll
-                    while roll < self.max_roll:
-                        x = self.min_x
-                        while x <= self.max_x:
-                            y = self.min_y
-                            while y <= self.max_y:
-                                num_poses = len(object_to_camera_poses)
-
-                                # generate camera center from spherical coords
-                                delta_t = np.array([x, y, 0])
-                                camera_center_obj = np.array([sph2cart(radius, az, elev)]).squeeze() + delta_t
-                                camera_z_obj = -np.array([sph2cart(radius, az, elev)]).squeeze()
-                                camera_z_obj = camera_z_obj / np.linalg.norm(camera_z_obj)
-
-                                # find the canonical camera x and y axes
-                                camera_x_par_obj = np.array([camera_z_obj[1], -camera_z_obj[0], 0])
-                                if np.linalg.norm(camera_x_par_obj) == 0:
-                                    camera_x_par_obj = np.array([1, 0, 0])
-                                camera_x_par_obj = camera_x_par_obj / np.linalg.norm(camera_x_par_obj)
-                                camera_y_par_obj = np.cross(camera_z_obj, camera_x_par_obj)
-                                camera_y_par_obj = camera_y_par_obj / np.linalg.norm(camera_y_par_obj)
-                                if camera_y_par_obj[2] > 0:
-                                    print ('Flipping', num_poses)
-                                    camera_x_par_obj = -camera_x_par_obj
-                                    camera_y_par_obj = np.cross(camera_z_obj, camera_x_par_obj)
-                                    camera_y_par_obj = camera_y_par_obj / np.linalg.norm(camera_y_par_obj)
-
-                                # rotate by the roll
-                                R_obj_camera_par = np.c_[camera_x_par_obj, camera_y_par_obj, camera_z_obj]
-                                R_camera_par_camera = np.array([[np.cos(roll), -np.sin(roll), 0],
-                                                                [np.sin(roll), np.cos(roll), 0],
-                                                                [0, 0, 1]])
-                                R_obj_camera = R_obj_camera_par.dot(R_camera_par_camera)
-                                t_obj_camera = camera_center_obj
-
-                                # create final transform
-                                T_obj_camera = RigidTransform(R_obj_camera, t_obj_camera,
-                                                              from_frame='camera',
-                                                              to_frame='obj')
-                            
-                                object_to_camera_poses.append(T_obj_camera.inverse())
-
-                                # compute pose without the center offset because we can easily add in the object offset later
-                                t_obj_camera_normalized = camera_center_obj - delta_t
-                                T_obj_camera_normalized = RigidTransform(R_obj_camera, t_obj_camera_normalized,
-                                                                         from_frame='camera',
-                                                                         to_frame='obj')
-                                object_to_camera_normalized_poses.append(T_obj_camera_normalized.inverse())
-
-                                # compute new camera center by projecting object 0,0,0 into the camera
-                                center_obj_obj = Point(np.zeros(3), frame='obj')
-                                center_obj_camera = T_obj_camera.inverse() * center_obj_obj
-                                u_center_obj = camera_intr.project(center_obj_camera)
-                                camera_shifted_intr = copy.deepcopy(camera_intr)
-                                camera_shifted_intr.cx = 2 * camera_intr.cx - float(u_center_obj.x)
-                                camera_shifted_intr.cy = 2 * camera_intr.cy - float(u_center_obj.y)
-                                camera_shifted_intrinsics.append(camera_shifted_intr)
-
-                                y += y_inc
-                            x += x_inc
-                        roll += roll_inc
-                    az += az_inc
-                elev += elev_inc
-            radius += radius_inc
+        for radius, elev, az, roll_ind, x, y in zip(*[g.ravel() for g in grid]):
+            # generate camera center from spherical coords
+            delta_t = np.array([x, y, 0])
+            camera_offset_obj = ViewsphereDiscretizer.sph2cart(radius, az, elev)
+            camera_center_obj = camera_offset_obj + delta_t
+            camera_z_obj = -camera_offset_obj / np.linalg.norm(camera_offset_obj)
+
+            # find the canonical camera x and y axes, choosing the sign of x so
+            # that y always points down (y_z = -sqrt(z_x^2 + z_y^2) <= 0)
+            h = np.sqrt(camera_z_obj[0]**2 + camera_z_obj[1]**2)
+            if h == 0:
+                camera_x_par_obj = np.array([1.0, 0, 0])
+            else:
+                camera_x_par_obj = np.array([camera_z_obj[1] / h, -camera_z_obj[0] / h, 0])
+            camera_y_par_obj = _cross3(camera_z_obj, camera_x_par_obj)
+
+            # rotate by the roll
+            R_obj_camera_par = np.c_[camera_x_par_obj, camera_y_par_obj, camera_z_obj]
+            R_camera_par_camera = R_camera_par_cameras[int(roll_ind)]
+            R_obj_camera = R_obj_camera_par.dot(R_camera_par_camera)
+            t_obj_camera = camera_center_obj
+
+            # create final transform, inverting the camera pose directly
+            R_camera_obj = R_obj_camera.T
+            T_camera_obj = RigidTransform(R_camera_obj, -R_camera_obj.dot(t_obj_camera),
+                                          from_frame='obj',
+                                          to_frame='camera')
+
+            object_to_camera_poses.append(T_camera_obj)
+
+            # compute pose without the center offset because we can easily add in the object offset later
+            t_obj_camera_normalized = camera_center_obj - delta_t
+            T_camera_obj_normalized = RigidTransform(R_camera_obj, -R_camera_obj.dot(t_obj_camera_normalized),
+                                                     from_frame='obj',
+                                                     to_frame='camera')
+            object_to_camera_normalized_poses.append(T_camera_obj_normalized)
+
+            # compute new camera center by projecting object 0,0,0 into the camera
+            center_obj_obj = Point(np.zeros(3), frame='obj')
+            center_obj_camera = T_camera_obj * center_obj_obj
+            u_center_obj = camera_intr.project(center_obj_camera)
+            camera_shifted_intr = copy.deepcopy(camera_intr)
+            camera_shifted_intr.cx = 2 * camera_intr.cx - float(u_center_obj.x)
+            camera_shifted_intr.cy = 2 * camera_intr.cy - float(u_center_obj.y)
+            camera_shifted_intrinsics.append(camera_shifted_intr)
         return object_to_camera_poses, object_to_camera_normalized_poses, camera_shifted_intrinsics
 
 class SceneObject(object):
@@ -402,6 +535,7 @@ class VirtualCamera(object):
             raise ValueError('Must provide camera intrinsics as a CameraIntrinsics object')
         self._camera_intr = camera_intr
         self._scene = {} 
+        self._mesh_cache = weakref.WeakKeyDictionary()
 
     def add_to_scene(self, name, scene_object):
         """ Add an object to the scene.
@@ -425,8 +559,35 @@ class VirtualCamera(object):
         """
         self._scene[name] = None
 
+    def _mesh_arrays(self, mesh):
+        """Get the vertex and triangle arrays of a mesh in the layout expected
+        by the renderer, reusing the arrays from previous renders of the mesh
+        when its vertices and triangles have not been reassigned.
+
+        Parameters
+        ----------
+        mesh : :obj:`Mesh3D`
+            The mesh to be rendered.
+
+        Returns
+        -------
+        :obj:`tuple` of :obj:`numpy.ndarray`
+            The contiguous float64 vertex array and int32 triangle array.
+        """
+        vertices = mesh.vertices
+        triangles = mesh.triangles
+        cached = self._mesh_cache.get(mesh)
+        if cached is not None and cached[0] is vertices and cached[1] is triangles:
+            return cached[2], cached[3]
+
+        vertex_arr = np.ascontiguousarray(vertices, dtype=np.float64)
+        tri_arr = np.ascontiguousarray(triangles, dtype=np.int32)
+        self._mesh_cache[mesh] = (vertices, triangles, vertex_arr, tri_arr)
+        return vertex_arr, tri_arr
+
     def images(self, mesh, object_to_camera_poses,
-               mat_props=None, light_props=None, enable_lighting=True, debug=False):
+               mat_props=None, light_props=None, enable_lighting=True, debug=False,
+               parallel=False, num_workers=None):
         """Render images of the given mesh at the list of object to camera poses.
 
         Parameters
@@ -443,20 +604,29 @@ class VirtualCamera(object):
             Whether or not to enable lighting
         debug : bool
             Whether or not to debug the C++ meshrendering code.
+        parallel : bool
+            Whether or not to split the poses across worker processes.
+        num_workers : int
+            Number of worker processes to use when rendering in parallel,
+            defaults to the number of CPUs.
 
         Returns
         -------
         :obj:`tuple` of `numpy.ndarray`
-            A 2-tuple of ndarrays. The first, which represents the color image,
-            contains ints (0 to 255) and is of shape (height, width, 3). 
+            A 2-tuple of ndarrays. The first, which represents the color images,
+            contains uint8s (0 to 255) and is of shape (N, height, width, 3).
             Each pixel is a 3-ndarray (red, green, blue) associated with a given
-            y and x value. The second, which represents the depth image,
-            contains floats and is of shape (height, width). Each pixel is a
-            single float that represents the depth of the image.
+            y and x value. The second, which represents the depth images,
+            contains float32s and is of shape (N, height, width). Each pixel is a
+            single float that represents the depth of the image. Both arrays
+            are allocated once per call, so the i-th image is a view into the
+            batch and keeps the whole batch alive while it is referenced.
         """
+        if num_workers is not None and num_workers < 1:
+            raise ValueError('Number of workers must be at least one')
+
         # get mesh spec as numpy arrays
-        vertex_arr = mesh.vertices
-        tri_arr = mesh.triangles.astype(np.int32)
+        vertex_arr, tri_arr = self._mesh_arrays(mesh)
         if mesh.normals is None:
             mesh.compute_vertex_normals()
         norms_arr = mesh.normals
@@ -470,34 +640,52 @@ class VirtualCamera(object):
         if light_props is None:
             light_props = LightingProperties()
 
+        # form projection matrices for all poses at once
+        Rs = np.array([T_obj_camera.rotation for T_obj_camera in object_to_camera_poses]).reshape(-1, 3, 3)
+        ts = np.array([T_obj_camera.translation for T_obj_camera in object_to_camera_poses]).reshape(-1, 3)
+        Rts = np.concatenate([Rs, ts[:,:,np.newaxis]], axis=2)
+        projections = np.einsum('ij,njk->nik', self._camera_intr.proj_matrix, Rts)
+
+        # form light props for each object to camera pose
+        light_props_arrs = []
+        for T_obj_camera in object_to_camera_poses:
+            light_props.set_pose(T_obj_camera)
+            light_props_arrs.append(light_props.arr)
+
         # render for each object to camera pose
         # TODO: clean up interface, use modelview matrix!!!!
-        color_ims = []
-        depth_ims = []
+        render_args = (self._camera_intr.height, self._camera_intr.width,
+                       vertex_arr, tri_arr, norms_arr, mat_props_arr,
+                       enable_lighting, debug)
+        num_poses = len(projections)
         render_start = time.time()
-        for T_obj_camera in object_to_camera_poses:
-            # form projection matrix
-            R = T_obj_camera.rotation
-            t = T_obj_camera.translation
-            P = self._camera_intr.proj_matrix.dot(np.c_[R, t])
-
-            # form light props
-            light_props.set_pose(T_obj_camera)
-            light_props_arr = light_props.arr
-
-            # render images for each
-            c, d = meshrender.render_mesh([P],
-                                          self._camera_intr.height,
-                                          self._camera_intr.width,
-                                          vertex_arr,
-                                          tri_arr,
-                                          norms_arr,
-                                          mat_props_arr,
-                                          light_props_arr,
-                                          enable_lighting,
-                                          debug)
-            color_ims.extend(c)
-            depth_ims.extend(d)
+        if parallel and num_poses > 1:
+            # the renderer holds the GIL, so split the poses across processes.
+            # the mesh is handed to each worker once through the pool
+            # initializer (inherited on fork) and only the poses are sent per
+            # chunk. the pool lives for this call only, so callers rendering
+            # many small batches should render them together
+            if num_workers is None:
+                num_workers = multiprocessing.cpu_count()
+            num_workers = min(num_workers, num_poses)
+            chunk_size = int(np.ceil(float(num_poses) / num_workers))
+            chunks = [(projections[i:i+chunk_size], light_props_arrs[i:i+chunk_size])
+                      for i in range(0, num_poses, chunk_size)]
+            pool = multiprocessing.Pool(num_workers, _init_render_worker, (render_args,))
+            try:
+                results = pool.map(_render_pose_chunk, chunks)
+            finally:
+                pool.close()
+                pool.join()
+            color_ims = np.empty([num_poses, self._camera_intr.height, self._camera_intr.width, 3],
+                                 dtype=np.uint8)
+            depth_ims = np.empty([num_poses, self._camera_intr.height, self._camera_intr.width],
+                                 dtype=np.float32)
+            for i, (c, d) in zip(range(0, num_poses, chunk_size), results):
+                color_ims[i:i+len(c)] = c
+                depth_ims[i:i+len(d)] = d
+        else:
+            color_ims, depth_ims = _render_poses((projections, light_props_arrs) + render_args)
         render_stop = time.time()
         logging.debug('Rendering took %.3f sec' %(render_stop - render_start))
 
@@ -521,19 +709,17 @@ class VirtualCamera(object):
         Returns
         -------
         :obj:`tuple` of `numpy.ndarray`
-            A 2-tuple of ndarrays. The first, which represents the color image,
-            contains ints (0 to 255) and is of shape (height, width, 3). 
-            Each pixel is a 3-ndarray (red, green, blue) associated with a given
-            y and x value. The second, which represents the depth image,
-            contains floats and is of shape (height, width). Each pixel is a
-            single float that represents the depth of the image.
+            A 2-tuple of ndarrays of color images of shape (N, height, width, 3)
+            and depth images of shape (N, height, width), as returned by
+            :meth:`images`.
         """
         return self.images(mesh, vs_disc.object_to_camera_poses(),
                            mat_props=mat_props, light_props=light_props)
 
     def wrapped_images(self, mesh, object_to_camera_poses,
                        render_mode, stable_pose=None, mat_props=None,
-                       light_props=None,debug=False):
+                       light_props=None,debug=False, parallel=False,
+                       num_workers=None):
         """Create ObjectRender objects of the given mesh at the list of object to camera poses.
 
         Parameters
@@ -553,6 +739,11 @@ class VirtualCamera(object):
             Lighting properties for the scene
         debug : bool
             Whether or not to debug the C++ meshrendering code.
+        parallel : bool
+            Whether or not to split the poses across worker processes.
+        num_workers : int
+            Number of worker processes to use when rendering in parallel,
+            defaults to the number of CPUs.
 
         Returns
         -------
@@ -566,12 +757,19 @@ class VirtualCamera(object):
             T_obj_stp = RigidTransform(rotation=stable_pose.r,
                                        translation=t_obj_stp,
                                        from_frame='obj',
-                                       to_frame='stp')            
-            stp_to_camera_poses = copy.copy(object_to_camera_poses)
+                                       to_frame='stp')
+            stp_to_camera_poses = object_to_camera_poses
+
+            # compose all poses with the stable pose at once
+            R_stp_camera = np.array([T_stp_camera.rotation for T_stp_camera in stp_to_camera_poses]).reshape(-1, 3, 3)
+            t_stp_camera = np.array([T_stp_camera.translation for T_stp_camera in stp_to_camera_poses]).reshape(-1, 3)
+            R_obj_camera = np.einsum('nij,jk->nik', R_stp_camera, T_obj_stp.rotation)
+            t_obj_camera = np.einsum('nij,j->ni', R_stp_camera, T_obj_stp.translation) + t_stp_camera
             object_to_camera_poses = []
-            for T_stp_camera in stp_to_camera_poses:
-                T_stp_camera.from_frame = 'stp'
-                object_to_camera_poses.append(T_stp_camera.dot(T_obj_stp))
+            for R, t, T_stp_camera in zip(R_obj_camera, t_obj_camera, stp_to_camera_poses):
+                object_to_camera_poses.append(RigidTransform(R, t,
+                                                             from_frame='obj',
+                                                             to_frame=T_stp_camera.to_frame))
 
         # set lighting mode
         enable_lighting = True
@@ -584,33 +782,31 @@ class VirtualCamera(object):
                                            mat_props=mat_props,
                                            light_props=light_props,
                                            enable_lighting=enable_lighting,
-                                           debug=debug)
+                                           debug=debug,
+                                           parallel=parallel,
+                                           num_workers=num_workers)
 
         # convert to image wrapper classes
-        images = []
         if render_mode == RenderMode.SEGMASK:
             # wrap binary images
-            for binary_im in color_ims:
-                images.append(BinaryImage(binary_im[:,:,0], frame=self._camera_intr.frame, threshold=0))
+            images = [BinaryImage(binary_im[:,:,0], frame=self._camera_intr.frame, threshold=0)
+                      for binary_im in color_ims]
 
         elif render_mode == RenderMode.COLOR:
             # wrap color images
-            for color_im in color_ims:
-                images.append(ColorImage(color_im, frame=self._camera_intr.frame))
+            images = [ColorImage(color_im, frame=self._camera_intr.frame) for color_im in color_ims]
 
         elif render_mode == RenderMode.COLOR_SCENE:
             # wrap color and depth images
-            for color_im in color_ims:
-                images.append(ColorImage(color_im, frame=self._camera_intr.frame))
+            images = [ColorImage(color_im, frame=self._camera_intr.frame) for color_im in color_ims]
 
             # render images of scene objects
             color_scene_ims = {}
             for name, scene_obj in self._scene.iteritems():
-                scene_object_to_camera_poses = []
-                for world_to_camera_pose in world_to_camera_poses:
-                    scene_object_to_camera_poses.append(world_to_camera_pose * scene_obj.T_mesh_world)
+                scene_object_to_camera_poses = [world_to_camera_pose * scene_obj.T_mesh_world
+                                                for world_to_camera_pose in world_to_camera_poses]
 
-                color_scene_ims[name] = self.wrapped_images(scene_obj.mesh, scene_object_to_camera_poses, RenderMode.COLOR, mat_props=scene_obj.mat_props, light_props=light_props, debug=debug)
+                color_scene_ims[name] = self.wrapped_images(scene_obj.mesh, scene_object_to_camera_poses, RenderMode.COLOR, mat_props=scene_obj.mat_props, light_props=light_props, debug=debug, parallel=parallel, num_workers=num_workers)
 
             # combine with scene images
             # TODO: re-add farther
@@ -621,21 +817,18 @@ class VirtualCamera(object):
 
         elif render_mode == RenderMode.DEPTH:
             # render depth image
-            for depth_im in depth_ims:
-                images.append(DepthImage(depth_im, frame=self._camera_intr.frame))
+            images = [DepthImage(depth_im, frame=self._camera_intr.frame) for depth_im in depth_ims]
 
         elif render_mode == RenderMode.DEPTH_SCENE:
             # create empty depth images
-            for depth_im in depth_ims:
-                images.append(DepthImage(depth_im, frame=self._camera_intr.frame))
+            images = [DepthImage(depth_im, frame=self._camera_intr.frame) for depth_im in depth_ims]
 
             # render images of scene objects
             depth_scene_ims = {}
             for name, scene_obj in self._scene.iteritems():
-                scene_object_to_camera_poses = []
-                for world_to_camera_pose in world_to_camera_poses:
-                    scene_object_to_camera_poses.append(world_to_camera_pose * scene_obj.T_mesh_world)
-                depth_scene_ims[name] = self.wrapped_images(scene_obj.mesh, scene_object_to_camera_poses, RenderMode.DEPTH, mat_props=scene_obj.mat_props, light_props=light_props)
+                scene_object_to_camera_poses = [world_to_camera_pose * scene_obj.T_mesh_world
+                                                for world_to_camera_pose in world_to_camera_poses]
+                depth_scene_ims[name] = self.wrapped_images(scene_obj.mesh, scene_object_to_camera_poses, RenderMode.DEPTH, mat_props=scene_obj.mat_props, light_props=light_props, parallel=parallel, num_workers=num_workers)
 
             # combine with scene images
             for i in range(len(images)):
@@ -644,26 +837,23 @@ class VirtualCamera(object):
 
         elif render_mode == RenderMode.RGBD:
             # create RGB-D images
-            for color_im, depth_im in zip(color_ims, depth_ims):
-                c = ColorImage(color_im, frame=self._camera_intr.frame)
-                d = DepthImage(depth_im, frame=self._camera_intr.frame)
-                images.append(RgbdImage.from_color_and_depth(c, d))
+            images = [RgbdImage.from_color_and_depth(ColorImage(color_im, frame=self._camera_intr.frame),
+                                                     DepthImage(depth_im, frame=self._camera_intr.frame))
+                      for color_im, depth_im in zip(color_ims, depth_ims)]
 
         elif render_mode == RenderMode.RGBD_SCENE:
             # create RGB-D images
-            for color_im, depth_im in zip(color_ims, depth_ims):
-                c = ColorImage(color_im, frame=self._camera_intr.frame)
-                d = DepthImage(depth_im, frame=self._camera_intr.frame)
-                images.append(RgbdImage.from_color_and_depth(c, d))
+            images = [RgbdImage.from_color_and_depth(ColorImage(color_im, frame=self._camera_intr.frame),
+                                                     DepthImage(depth_im, frame=self._camera_intr.frame))
+                      for color_im, depth_im in zip(color_ims, depth_ims)]
 
             # render images of scene objects
             rgbd_scene_ims = {}
             for name, scene_obj in self._scene.iteritems():
-                scene_object_to_camera_poses = []
-                for world_to_camera_pose in world_to_camera_poses:
-                    scene_object_to_camera_poses.append(world_to_camera_pose * scene_obj.T_mesh_world)
+                scene_object_to_camera_poses = [world_to_camera_pose * scene_obj.T_mesh_world
+                                                for world_to_camera_pose in world_to_camera_poses]
 
-                rgbd_scene_ims[name] = self.wrapped_images(scene_obj.mesh, scene_object_to_camera_poses, RenderMode.RGBD, mat_props=scene_obj.mat_props, light_props=light_props, debug=debug)
+                rgbd_scene_ims[name] = self.wrapped_images(scene_obj.mesh, scene_object_to_camera_poses, RenderMode.RGBD, mat_props=scene_obj.mat_props, light_props=light_props, debug=debug, parallel=parallel, num_workers=num_workers)
 
            # combine with scene images
             for i in range(len(images)):
@@ -672,19 +862,19 @@ class VirtualCamera(object):
 
         elif render_mode == RenderMode.SCALED_DEPTH:
             # convert to color image
-            for depth_im in depth_ims:
-                d = DepthImage(depth_im, frame=self._camera_intr.frame)
-                images.append(d.to_color())
+            images = [DepthImage(depth_im, frame=self._camera_intr.frame).to_color() for depth_im in depth_ims]
         else:
             raise ValueError('Render mode %s not supported' %(render_mode))
 
         # create object renders
         if stable_pose is not None:
-            object_to_camera_poses = copy.copy(stp_to_camera_poses)
-        rendered_images = []
-        for image, T_obj_camera in zip(images, object_to_camera_poses):
-            T_camera_obj = T_obj_camera.inverse()
-            rendered_images.append(ObjectRender(image, T_camera_obj))
+            object_to_camera_poses = stp_to_camera_poses
+        camera_to_object_poses = [T_obj_camera.inverse() for T_obj_camera in object_to_camera_poses]
+        if stable_pose is not None:
+            camera_to_object_poses = [T_camera_obj.as_frames(T_camera_obj.from_frame, 'stp')
+                                      for T_camera_obj in camera_to_object_poses]
+        rendered_images = [ObjectRender(image, T_camera_obj)
+                           for image, T_camera_obj in zip(images, camera_to_object_poses)]
 
         return rendered_images
 
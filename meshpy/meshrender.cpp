@@ -35,24 +35,24 @@ void uint2uchar(unsigned int in, unsigned char* out){
   out[2] =  in & 0x000000ff;
 }
 
-boost::python::tuple render_mesh(boost::python::list proj_matrices,
-                                 unsigned int im_height,
-                                 unsigned int im_width,
-                                 boost::python::numeric::array verts,
-                                 boost::python::numeric::array tris,
-                                 boost::python::numeric::array norms,
-                                 boost::python::numeric::array mat_props,
-                                 boost::python::numeric::array light_props,
-				 bool enable_lighting = false,
-                                 bool debug = false)
+// Renders each projection into consecutive images of the contiguous
+// color (N x height x width x 3) and depth (N x height x width) buffers
+void render_mesh_to_buffers(boost::python::list proj_matrices,
+                            unsigned int im_height,
+                            unsigned int im_width,
+                            boost::python::numeric::array verts,
+                            boost::python::numeric::array tris,
+                            boost::python::numeric::array norms,
+                            boost::python::numeric::array mat_props,
+                            boost::python::numeric::array light_props,
+                            bool enable_lighting,
+                            bool debug,
+                            unsigned char* color_out,
+                            float* depth_out)
 {
   // init rendering vars
   OSMesaContext ctx;
-  boost::python::list color_ims;
-  boost::python::list depth_ims;
   void *buffer;
-  unsigned char* color_result = NULL;
-  float* depth_result = NULL;
 
   // parse input data
   int num_projections = boost::python::len(proj_matrices);
@@ -288,8 +288,7 @@ boost::python::tuple render_mesh(boost::python::list proj_matrices,
     GLboolean succeeded;
     unsigned char* p_color_buffer;
     succeeded = OSMesaGetColorBuffer(ctx, &out_width, &out_height, &color_type, (void**)&p_color_buffer);
-    if (color_result == NULL)
-      color_result = new unsigned char[3 * out_width * out_height];
+    unsigned char* color_result = color_out + 3 * k * im_width * im_height;
     for (i = 0; i < out_width; i++) {
       for (j = 0; j < out_height; j++) {
         int di = i + j * out_width; // index in color buffer
@@ -303,8 +302,7 @@ boost::python::tuple render_mesh(boost::python::list proj_matrices,
     // pull depth buffer and flip y axis
     unsigned short* p_depth_buffer;
     succeeded = OSMesaGetDepthBuffer(ctx, &out_width, &out_height, &bytes_per_depth, (void**)&p_depth_buffer);
-    if (depth_result == NULL)
-      depth_result = new float[out_width * out_height];
+    float* depth_result = depth_out + k * im_width * im_height;
     for(i = 0; i < out_width; i++){
       for(j = 0; j < out_height; j++){
         int di = i + j * out_width; // index in depth buffer
@@ -317,11 +315,41 @@ boost::python::tuple render_mesh(boost::python::list proj_matrices,
         }
       }
     }
+  }
 
+  // free the image buffer
+  free( buffer );
+
+  // destroy the context
+  OSMesaDestroyContext( ctx );
+}
+
+boost::python::tuple render_mesh(boost::python::list proj_matrices,
+                                 unsigned int im_height,
+                                 unsigned int im_width,
+                                 boost::python::numeric::array verts,
+                                 boost::python::numeric::array tris,
+                                 boost::python::numeric::array norms,
+                                 boost::python::numeric::array mat_props,
+                                 boost::python::numeric::array light_props,
+				 bool enable_lighting = false,
+                                 bool debug = false)
+{
+  boost::python::list color_ims;
+  boost::python::list depth_ims;
+  int num_projections = boost::python::len(proj_matrices);
+  unsigned char* color_result = new unsigned char[3 * num_projections * im_width * im_height];
+  float* depth_result = new float[num_projections * im_width * im_height];
+  render_mesh_to_buffers(proj_matrices, im_height, im_width, verts, tris, norms,
+                         mat_props, light_props, enable_lighting, debug,
+                         color_result, depth_result);
+
+  for (unsigned int k = 0; k < num_projections; k++) {
     // append ndarray color image to list
     boost::python::tuple color_shape = boost::python::make_tuple(im_height, im_width, 3);
     boost::numpy::dtype color_dt = boost::numpy::dtype::get_builtin<unsigned char>();
-    boost::numpy::ndarray color_arr = boost::numpy::from_data(color_result, color_dt, color_shape,
+    boost::numpy::ndarray color_arr = boost::numpy::from_data(color_result + 3 * k * im_width * im_height,
+                                                              color_dt, color_shape,
                                                               boost::python::make_tuple(color_shape[1]*color_shape[2]*sizeof(unsigned char),
                                                                                         color_shape[2]*sizeof(unsigned char),
                                                                                         sizeof(unsigned char)),
@@ -331,30 +359,60 @@ boost::python::tuple render_mesh(boost::python::list proj_matrices,
     // append ndarray depth image to list
     boost::python::tuple depth_shape = boost::python::make_tuple(im_height, im_width);
     boost::numpy::dtype depth_dt = boost::numpy::dtype::get_builtin<float>();
-    boost::numpy::ndarray depth_arr = boost::numpy::from_data(depth_result, depth_dt, depth_shape,
+    boost::numpy::ndarray depth_arr = boost::numpy::from_data(depth_result + k * im_width * im_height,
+                                                              depth_dt, depth_shape,
                                                               boost::python::make_tuple(depth_shape[1]*sizeof(float),
                                                                                         sizeof(float)),
                                                               boost::python::object());
     depth_ims.append(depth_arr.copy());
   }
 
-  // free the image buffer
-  free( buffer );
-
-  // destroy the context
-  OSMesaDestroyContext( ctx );
-
   //return depth_ims;
   boost::python::tuple ret_tuple = boost::python::make_tuple(color_ims, depth_ims);
 
-  if (color_result != NULL)
-    delete [] color_result;
-  if (depth_result != NULL)
-    delete [] depth_result;
+  delete [] color_result;
+  delete [] depth_result;
 
   return ret_tuple;
 }
 
+// Renders directly into caller-allocated contiguous ndarrays of shape
+// (N, height, width, 3) uint8 for color and (N, height, width) float32 for depth
+void render_mesh_into(boost::python::list proj_matrices,
+                      unsigned int im_height,
+                      unsigned int im_width,
+                      boost::python::numeric::array verts,
+                      boost::python::numeric::array tris,
+                      boost::python::numeric::array norms,
+                      boost::python::numeric::array mat_props,
+                      boost::python::numeric::array light_props,
+                      boost::python::numeric::array out_color,
+                      boost::python::numeric::array out_depth,
+                      bool enable_lighting = false,
+                      bool debug = false)
+{
+  // get writable output buffers
+  int num_projections = boost::python::len(proj_matrices);
+  long int color_buflen;
+  long int depth_buflen;
+  void *color_raw_buffer;
+  void *depth_raw_buffer;
+  if (PyObject_AsWriteBuffer(out_color.ptr(), &color_raw_buffer, &color_buflen) ||
+      PyObject_AsWriteBuffer(out_depth.ptr(), &depth_raw_buffer, &depth_buflen)) {
+    boost::python::throw_error_already_set();
+  }
+  if (color_buflen < (long int)(3 * num_projections * im_width * im_height * sizeof(unsigned char)) ||
+      depth_buflen < (long int)(num_projections * im_width * im_height * sizeof(float))) {
+    PyErr_SetString(PyExc_ValueError, "Output buffers are too small for the requested images");
+    boost::python::throw_error_already_set();
+  }
+
+  render_mesh_to_buffers(proj_matrices, im_height, im_width, verts, tris, norms,
+                         mat_props, light_props, enable_lighting, debug,
+                         reinterpret_cast<unsigned char*>(color_raw_buffer),
+                         reinterpret_cast<float*>(depth_raw_buffer));
+}
+
 // Test function for multiplying an array by a scalar
 boost::python::list mul_array(boost::python::numeric::array data, int x)
 {
@@ -392,4 +450,5 @@ BOOST_PYTHON_MODULE(meshrender) {
 
   def("mul_array", &mul_array);
   def("render_mesh", &render_mesh);
+  def("render_mesh_into", &render_mesh_into);
 }
@@ -9,10 +9,9 @@ import numpy as np
 import scipy.stats as ss
 
 from autolab_core import Point, RigidTransform, RandomVariable
-from autolab_core.utils import sph2cart, cart2sph
 from perception import CameraIntrinsics, BinaryImage, ColorImage, DepthImage, ObjectRender, RenderMode
 
-from mesh_renderer import VirtualCamera, SceneObject
+from mesh_renderer import VirtualCamera, SceneObject, ViewsphereDiscretizer
 
 class CameraSample(object):
     """ Struct to encapsulate the results of sampling a camera and its pose. """
@@ -96,7 +95,7 @@ class UniformViewsphereRandomVariable(RandomVariable):
     def object_to_camera_pose(self, radius, elev, az, roll):
         """ Convert spherical coords to an object-camera pose. """
         # generate camera center from spherical coords
-        camera_center_obj = np.array([sph2cart(radius, az, elev)]).squeeze()
+        camera_center_obj = ViewsphereDiscretizer.sph2cart(radius, az, elev)
         camera_z_obj = -camera_center_obj / np.linalg.norm(camera_center_obj)
 
         # find the canonical camera x and y axes
@@ -275,8 +274,9 @@ class UniformPlanarWorksurfaceRandomVariable(RandomVariable):
         """ Convert spherical coords to an object-camera pose. """
         # generate camera center from spherical coords
         delta_t = np.array([x, y, 0])
-        camera_center_obj = np.array([sph2cart(radius, az, elev)]).squeeze() + delta_t
-        camera_z_obj = -np.array([sph2cart(radius, az, elev)]).squeeze()
+        camera_offset_obj = ViewsphereDiscretizer.sph2cart(radius, az, elev)
+        camera_center_obj = camera_offset_obj + delta_t
+        camera_z_obj = -camera_offset_obj
         camera_z_obj = camera_z_obj / np.linalg.norm(camera_z_obj)
         
         # find the canonical camera x and y axes
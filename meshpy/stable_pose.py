@@ -9,6 +9,13 @@ from autolab_core import RigidTransform
 
 d_theta = np.deg2rad(1)
 
+def _det3(r):
+    """ Determinant of a 3x3 matrix by cofactor expansion, which avoids the
+    LAPACK overhead of np.linalg.det for such small matrices """
+    return r[0,0] * (r[1,1] * r[2,2] - r[1,2] * r[2,1]) - \
+           r[0,1] * (r[1,0] * r[2,2] - r[1,2] * r[2,0]) + \
+           r[0,2] * (r[1,0] * r[2,1] - r[1,1] * r[2,0])
+
 class StablePose(object):
     """A representation of a mesh's stable pose.
 
@@ -52,7 +59,7 @@ class StablePose(object):
         self.id = stp_id
 
         # fix stable pose bug
-        if np.abs(np.linalg.det(self.r) + 1) < 0.01:
+        if np.abs(_det3(self.r) + 1) < 0.01:
             self.r[1,:] = -self.r[1,:]
 
     def __eq__(self, other):
@@ -73,7 +80,17 @@ class StablePose(object):
 
     @property
     def T_obj_table(self):
-        return RigidTransform(rotation=self.r, from_frame='obj', to_frame='table')
+        """ :obj:`RigidTransform` : The rotation of the stable pose from obj to
+        table frame. The transform is cached and shared between calls, so treat
+        it as read-only and copy it before modifying.
+        """
+        # cache the transform along with a snapshot of the rotation it was built
+        # from, rebuilding it if the rotation is reassigned or edited in place
+        cached = self.__dict__.get('_T_obj_table')
+        if cached is None or not np.array_equal(cached[0], self.r):
+            cached = (np.array(self.r), RigidTransform(rotation=self.r, from_frame='obj', to_frame='table'))
+            self._T_obj_table = cached
+        return cached[1]
 
 
     @property
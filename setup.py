@@ -33,6 +33,9 @@ setup(name='meshpy',
     packages=['meshpy'],
     #ext_modules = [meshrender],
     install_requires=requirements,
+    extras_require={
+        'numba': ['numba'],
+    },
     test_suite='test',
     cmdclass={
         'install': PostInstallCmd,
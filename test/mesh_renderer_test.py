@@ -0,0 +1,229 @@
+from collections import namedtuple
+from unittest import TestCase, skipIf
+import numpy as np
+from perception import CameraIntrinsics
+from meshpy import Mesh3D, mesh_renderer
+from meshpy.mesh_renderer import ViewsphereDiscretizer, PlanarWorksurfaceDiscretizer, VirtualCamera
+
+Pixel = namedtuple('Pixel', ['x', 'y'])
+
+class StubIntrinsics(object):
+    """ Pinhole camera exposing only what the planar discretizer uses """
+    def __init__(self, f, cx, cy):
+        self.f = f
+        self.cx = cx
+        self.cy = cy
+
+    def project(self, point):
+        p = point.data
+        return Pixel(self.f * p[0] / p[2] + self.cx, self.f * p[1] / p[2] + self.cy)
+
+class FakeMeshrender(object):
+    """ Stands in for the meshrender extension, filling each image with
+    values derived from its projection matrix """
+    @staticmethod
+    def render_mesh_into(proj_matrices, im_height, im_width, verts, tris, norms,
+                         mat_props, light_props, out_color, out_depth,
+                         enable_lighting=False, debug=False):
+        for k, P in enumerate(proj_matrices):
+            out_color[k] = int(1000 * abs(P[0,3])) % 256
+            out_depth[k] = P[2,3]
+
+class TestViewsphereDiscretizer(TestCase):
+
+    def test_generic_pose(self):
+        vs_disc = ViewsphereDiscretizer(0.5, 0.5, 1, 0.7, 0.7, 1,
+                                        min_az=0.3, num_az=1,
+                                        min_roll=0.2, num_roll=1)
+        poses = vs_disc.object_to_camera_poses()
+        self.assertEqual(len(poses), 1)
+        R = [[-0.14446544320859608, 0.9811978615689314, -0.12798629680985413],
+             [0.7748274658375164, 0.031724782190475746, -0.6313762241158432],
+             [-0.6154446635582734, -0.19037934406737264, -0.7648421872844885]]
+        t = [0.0, 0.0, 0.5]
+        self.assertTrue(np.allclose(poses[0].rotation, R))
+        self.assertTrue(np.allclose(poses[0].translation, t))
+        self.assertEqual(poses[0].from_frame, 'obj')
+        self.assertEqual(poses[0].to_frame, 'camera')
+
+    def test_pole_pose(self):
+        vs_disc = ViewsphereDiscretizer(0.5, 0.5, 1, 0.0, 0.0, 1)
+        poses = vs_disc.object_to_camera_poses()
+        self.assertEqual(len(poses), 1)
+        R = [[1.0, 0.0, 0.0],
+             [0.0, -1.0, 0.0],
+             [0.0, 0.0, -1.0]]
+        t = [0.0, 0.0, 0.5]
+        self.assertTrue(np.allclose(poses[0].rotation, R))
+        self.assertTrue(np.allclose(poses[0].translation, t))
+
+    @skipIf(mesh_renderer.build_rotations is None, 'numba is not installed')
+    def test_numba_matches_numpy(self):
+        vs_disc = ViewsphereDiscretizer(0.5, 0.7, 3, 0.0, np.pi, 5,
+                                        num_az=8, num_roll=4)
+        numba_poses = vs_disc.object_to_camera_poses()
+        build_rotations = mesh_renderer.build_rotations
+        mesh_renderer.build_rotations = None
+        try:
+            numpy_poses = vs_disc.object_to_camera_poses()
+        finally:
+            mesh_renderer.build_rotations = build_rotations
+        self.assertEqual(len(numba_poses), len(numpy_poses))
+        for T_numba, T_numpy in zip(numba_poses, numpy_poses):
+            self.assertTrue(np.allclose(T_numba.rotation, T_numpy.rotation))
+            self.assertTrue(np.allclose(T_numba.translation, T_numpy.translation))
+
+    def test_sph2cart_shapes(self):
+        p = ViewsphereDiscretizer.sph2cart(2.0, np.pi / 2, np.pi / 2)
+        self.assertEqual(p.shape, (3,))
+        self.assertTrue(np.allclose(p, [0.0, 2.0, 0.0]))
+
+        r = np.array([1.0, 2.0, 0.5, 1.5])
+        az = np.array([0.0, np.pi / 2, np.pi, 0.3])
+        elev = np.array([np.pi / 2, np.pi / 2, 0.0, 1.2])
+        points = ViewsphereDiscretizer.sph2cart(r, az, elev)
+        self.assertEqual(points.shape, (4, 3))
+        for i in range(4):
+            self.assertTrue(np.allclose(points[i], ViewsphereDiscretizer.sph2cart(r[i], az[i], elev[i])))
+        self.assertTrue(np.allclose(points[2], [0.0, 0.0, 0.5]))
+
+    def test_cart2sph(self):
+        # round trip through sph2cart in each quadrant
+        for az in [0.4, 2.0, 3.5, 5.5]:
+            x, y, z = ViewsphereDiscretizer.sph2cart(1.5, az, 1.1)
+            r, az_out, elev = ViewsphereDiscretizer.cart2sph(x, y, z)
+            self.assertAlmostEqual(r, 1.5)
+            self.assertAlmostEqual(az_out, az)
+            self.assertAlmostEqual(elev, 1.1)
+
+        # points on the axes
+        r, az, elev = ViewsphereDiscretizer.cart2sph(-2.0, 0.0, 0.0)
+        self.assertAlmostEqual(r, 2.0)
+        self.assertAlmostEqual(az, np.pi)
+        self.assertAlmostEqual(elev, np.pi / 2)
+        r, az, elev = ViewsphereDiscretizer.cart2sph(0.0, -1.0, 0.0)
+        self.assertAlmostEqual(az, 3 * np.pi / 2)
+        r, az, elev = ViewsphereDiscretizer.cart2sph(0.0, 0.0, -1.0)
+        self.assertAlmostEqual(elev, np.pi)
+
+        # array input
+        rs = np.array([1.0, 2.0, 0.5])
+        azs = np.array([0.1, 3.0, 6.0])
+        elevs = np.array([0.2, 1.5, 2.9])
+        points = ViewsphereDiscretizer.sph2cart(rs, azs, elevs)
+        r, az, elev = ViewsphereDiscretizer.cart2sph(points[:,0], points[:,1], points[:,2])
+        self.assertTrue(np.allclose(r, rs))
+        self.assertTrue(np.allclose(az, azs))
+        self.assertTrue(np.allclose(elev, elevs))
+
+    def test_empty_az_range(self):
+        vs_disc = ViewsphereDiscretizer(0.5, 0.5, 1, 0.7, 0.7, 1,
+                                        min_az=0.3, max_az=0.3, num_az=4)
+        self.assertEqual(len(vs_disc.object_to_camera_poses()), 0)
+
+class TestPlanarWorksurfaceDiscretizer(TestCase):
+
+    def setUp(self):
+        self.sphere_args = (0.5, 0.7, 2, 0.2, 0.9, 2)
+        self.sphere_kwargs = dict(min_az=0.1, max_az=2.0, num_az=3,
+                                  min_roll=0.0, max_roll=1.0, num_roll=2)
+        self.xs = [-0.1, 0.1]
+        self.ys = [0.0, 0.05, 0.1]
+        self.camera_intr = StubIntrinsics(500.0, 320.0, 240.0)
+        pw_disc = PlanarWorksurfaceDiscretizer(*self.sphere_args,
+                                               min_x=-0.1, max_x=0.1, num_x=2,
+                                               min_y=0.0, max_y=0.1, num_y=3,
+                                               **self.sphere_kwargs)
+        self.poses, self.normalized_poses, self.shifted_intrs = pw_disc.object_to_camera_poses(self.camera_intr)
+        vs_disc = ViewsphereDiscretizer(*self.sphere_args, **self.sphere_kwargs)
+        self.sphere_poses = vs_disc.object_to_camera_poses()
+
+    def test_pose_count(self):
+        num_poses = 2 * 2 * 3 * 2 * 2 * 3
+        self.assertEqual(len(self.sphere_poses), num_poses // 6)
+        self.assertEqual(len(self.poses), num_poses)
+        self.assertEqual(len(self.normalized_poses), num_poses)
+        self.assertEqual(len(self.shifted_intrs), num_poses)
+
+    def test_pose_order(self):
+        # poses are ordered by radius, elev, az, roll, then x and y
+        i = 0
+        for T_sphere in self.sphere_poses:
+            camera_center = T_sphere.inverse().translation
+            for x in self.xs:
+                for y in self.ys:
+                    T_camera_obj = self.poses[i]
+                    self.assertTrue(np.allclose(T_camera_obj.rotation, T_sphere.rotation))
+                    self.assertTrue(np.allclose(T_camera_obj.inverse().translation,
+                                                camera_center + np.array([x, y, 0])))
+                    self.assertEqual(T_camera_obj.from_frame, 'obj')
+                    self.assertEqual(T_camera_obj.to_frame, 'camera')
+                    i += 1
+
+    def test_normalized_poses(self):
+        for i, T_normalized in enumerate(self.normalized_poses):
+            T_sphere = self.sphere_poses[i // 6]
+            self.assertTrue(np.allclose(T_normalized.rotation, T_sphere.rotation))
+            self.assertTrue(np.allclose(T_normalized.translation, T_sphere.translation))
+
+    def test_shifted_intrinsics(self):
+        for T_camera_obj, shifted_intr in zip(self.poses, self.shifted_intrs):
+            p = T_camera_obj.translation
+            u = self.camera_intr.f * p[0] / p[2] + self.camera_intr.cx
+            v = self.camera_intr.f * p[1] / p[2] + self.camera_intr.cy
+            self.assertAlmostEqual(shifted_intr.cx, 2 * self.camera_intr.cx - u)
+            self.assertAlmostEqual(shifted_intr.cy, 2 * self.camera_intr.cy - v)
+            self.assertEqual(shifted_intr.f, self.camera_intr.f)
+
+        # the input intrinsics are left untouched
+        self.assertEqual(self.camera_intr.cx, 320.0)
+        self.assertEqual(self.camera_intr.cy, 240.0)
+
+    def test_empty_roll_range(self):
+        pw_disc = PlanarWorksurfaceDiscretizer(0.5, 0.5, 1, 0.7, 0.7, 1,
+                                               min_roll=1.0, max_roll=1.0, num_roll=2)
+        poses, normalized_poses, shifted_intrs = pw_disc.object_to_camera_poses(self.camera_intr)
+        self.assertEqual(len(poses), 0)
+        self.assertEqual(len(normalized_poses), 0)
+        self.assertEqual(len(shifted_intrs), 0)
+
+class TestVirtualCamera(TestCase):
+
+    def setUp(self):
+        self.meshrender = getattr(mesh_renderer, 'meshrender', None)
+        mesh_renderer.meshrender = FakeMeshrender
+        camera_intr = CameraIntrinsics('camera', fx=100.0, fy=100.0, cx=16.0, cy=12.0,
+                                       height=24, width=32)
+        self.camera = VirtualCamera(camera_intr)
+        self.mesh = Mesh3D(np.array([[0.0, 0.0, 0.0],
+                                     [0.1, 0.0, 0.0],
+                                     [0.0, 0.1, 0.0],
+                                     [0.0, 0.0, 0.1]]),
+                           np.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]]))
+        vs_disc = ViewsphereDiscretizer(0.5, 0.7, 2, 0.1, 1.0, 2, num_az=3, num_roll=2)
+        self.poses = vs_disc.object_to_camera_poses()
+
+    def tearDown(self):
+        if self.meshrender is None:
+            del mesh_renderer.meshrender
+        else:
+            mesh_renderer.meshrender = self.meshrender
+
+    def test_parallel_matches_serial(self):
+        color_ims, depth_ims = self.camera.images(self.mesh, self.poses)
+        self.assertEqual(color_ims.shape, (len(self.poses), 24, 32, 3))
+        self.assertEqual(depth_ims.shape, (len(self.poses), 24, 32))
+        self.assertEqual(color_ims.dtype, np.uint8)
+        self.assertEqual(depth_ims.dtype, np.float32)
+
+        # uneven chunks must still come back in pose order
+        par_color_ims, par_depth_ims = self.camera.images(self.mesh, self.poses,
+                                                          parallel=True, num_workers=5)
+        self.assertTrue(np.array_equal(par_color_ims, color_ims))
+        self.assertTrue(np.array_equal(par_depth_ims, depth_ims))
+        for T_obj_camera, depth_im in zip(self.poses, par_depth_ims):
+            self.assertTrue(np.allclose(depth_im, T_obj_camera.translation[2]))
+
+    def test_invalid_num_workers(self):
+        with self.assertRaises(ValueError):
+            self.camera.images(self.mesh, self.poses, parallel=True, num_workers=0)
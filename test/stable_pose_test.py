@@ -0,0 +1,45 @@
+from unittest import TestCase
+import numpy as np
+from autolab_core import RigidTransform
+from meshpy import StablePose
+from meshpy.stable_pose import _det3
+
+class TestStablePose(TestCase):
+
+    def test_det3(self):
+        R = RigidTransform.z_axis_rotation(0.3).dot(RigidTransform.x_axis_rotation(1.2))
+        self.assertAlmostEqual(_det3(R), np.linalg.det(R))
+        self.assertAlmostEqual(_det3(R), 1.0)
+        R_improper = R.dot(np.diag([1.0, -1.0, 1.0]))
+        self.assertAlmostEqual(_det3(R_improper), np.linalg.det(R_improper))
+        self.assertAlmostEqual(_det3(R_improper), -1.0)
+
+    def test_init_flips_improper_rotation(self):
+        R = RigidTransform.z_axis_rotation(0.3).dot(RigidTransform.x_axis_rotation(1.2))
+        R_improper = np.diag([1.0, -1.0, 1.0]).dot(R)
+        stp = StablePose(0.5, R_improper.copy(), np.zeros(3))
+        self.assertTrue(np.allclose(stp.r, R))
+        self.assertAlmostEqual(np.linalg.det(stp.r), 1.0)
+
+        # proper rotations are left alone
+        stp = StablePose(0.5, R.copy(), np.zeros(3))
+        self.assertTrue(np.allclose(stp.r, R))
+
+    def test_T_obj_table_cache(self):
+        stp = StablePose(0.5, RigidTransform.z_axis_rotation(0.3), np.zeros(3))
+        T_obj_table = stp.T_obj_table
+        self.assertTrue(stp.T_obj_table is T_obj_table)
+        self.assertTrue(np.allclose(T_obj_table.rotation, stp.r))
+        self.assertEqual(T_obj_table.from_frame, 'obj')
+        self.assertEqual(T_obj_table.to_frame, 'table')
+
+        # reassigning the rotation rebuilds the transform
+        stp.r = RigidTransform.x_axis_rotation(0.7)
+        self.assertFalse(stp.T_obj_table is T_obj_table)
+        self.assertTrue(np.allclose(stp.T_obj_table.rotation, stp.r))
+
+        # as does editing it in place
+        T_obj_table = stp.T_obj_table
+        stp.r[:] = RigidTransform.y_axis_rotation(-0.2)
+        self.assertFalse(stp.T_obj_table is T_obj_table)
+        self.assertTrue(np.allclose(stp.T_obj_table.rotation, stp.r))